@@ -0,0 +1,187 @@
+import logging
+import pytest
+from utils import contract
+from utils.check import Check
+from utils.contract import (VOLATILE_FIELDS, check_contract, check_snapshot, diff,
+                            fingerprint, load_snapshot)
+
+logger = logging.getLogger(__name__)
+
+POSTS = [
+    {"id": index, "user_id": 7, "title": f"Post {index}", "body": "This is a sample post body."}
+    for index in range(1000)
+]
+
+@pytest.fixture
+def snapshot_dir(tmp_path, monkeypatch):
+    """
+    Fixture to store snapshots in a temporary directory.
+    """
+    monkeypatch.setattr(contract, "SNAPSHOT_DIR", tmp_path)
+    monkeypatch.delenv(contract.UPDATE_SNAPSHOTS_ENV, raising=False)
+    monkeypatch.delenv(contract.CI_ENV, raising=False)
+    return tmp_path
+
+def test_fingerprint_ignores_volatile_fields():
+    """
+    Test that ignored fields do not change the fingerprint.
+    """
+    first = {"id": 1, "email": "a@example.com", "name": "Test User"}
+    second = {"id": 2, "email": "b@example.com", "name": "Test User"}
+
+    assert fingerprint(first, ["id", "email"]).digest == fingerprint(second, ["id", "email"]).digest
+    assert fingerprint(first).digest != fingerprint(second).digest
+
+def test_diff_ignores_fields_missing_from_expectation():
+    """
+    Test that ignored fields present only in the response are not reported.
+    """
+    post_data = {"title": "Sample Post Title", "body": "This is a sample post body."}
+    response_data = dict(post_data, id=42, user_id=7)
+
+    assert diff(response_data, post_data, VOLATILE_FIELDS) == []
+    assert diff(post_data, response_data, VOLATILE_FIELDS) == []
+
+def test_diff_reports_only_changed_items():
+    """
+    Test diffing a large list where a single item changed.
+    """
+    actual = [dict(post, id=index + 1000) for index, post in enumerate(POSTS)]
+    actual[500]["title"] = "Changed title"
+
+    diffs = diff(actual, POSTS, ["[*].id", "user_id"])
+    logger.info(f"Diffs: {diffs}")
+    assert diffs == ["[500].title: expected 'Post 500', actual 'Changed title'"]
+
+def test_diff_aligns_inserted_and_removed_items():
+    """
+    Test that inserting or removing a list item is reported once.
+    """
+    assert diff([0, 0, 1, 2, 3, 4], [0, 1, 2, 3, 4]) == [
+        "<root>: expected 5 items, actual 6 items",
+        "[1]: unexpected, actual 0",
+    ]
+    assert diff(POSTS[1:], POSTS) == [
+        "<root>: expected 1000 items, actual 999 items",
+        f"[expected 0]: missing, expected {POSTS[0]!r}",
+    ]
+
+def test_diff_duplicate_items():
+    """
+    Test diffing a large list whose items are identical once ids are ignored.
+    """
+    expected = [{"id": index, "title": "Same", "body": "Same body"} for index in range(5000)]
+    actual = [dict(post, id=0) for post in expected]
+    for index in (10, 2500, 4990):
+        actual[index]["title"] = "x"
+
+    assert diff(actual, expected, ["id"]) == [
+        f"[{index}].title: expected 'Same', actual 'x'" for index in (10, 2500, 4990)
+    ]
+
+    inserted = actual[:100] + [{"title": "New", "body": "New body"}] + actual[100:]
+    assert diff(inserted, expected, ["id"]) == [
+        "<root>: expected 5000 items, actual 5001 items",
+        "[10].title: expected 'Same', actual 'x'",
+        "[100]: unexpected, actual {'title': 'New', 'body': 'New body'}",
+        "[2501].title: expected 'Same', actual 'x'",
+        "[4991].title: expected 'Same', actual 'x'",
+    ]
+
+def test_diff_ignores_list_items():
+    """
+    Test that ignore rules also apply to list items.
+    """
+    assert diff([1, 2], [1, 3], ["[1]"]) == []
+    assert diff({"tags": [1, 2]}, {"tags": [3, 4]}, ["tags[*]"]) == []
+    assert diff([1, 2], [1, 3], ["[0]"]) == ["[1]: expected 3, actual 2"]
+
+def test_diff_reports_missing_and_unexpected_fields():
+    """
+    Test diffing dicts with missing, unexpected and mismatched lengths.
+    """
+    expected = {"name": "Test User", "status": "active", "tags": [1, 2]}
+    actual = {"name": "Test User", "gender": "male", "tags": [1]}
+
+    assert sorted(diff(actual, expected)) == [
+        "gender: unexpected, actual 'male'",
+        "status: missing, expected 'active'",
+        "tags: expected 2 items, actual 1 items",
+        "tags[expected 1]: missing, expected 2",
+    ]
+
+def test_diff_rejects_fingerprint_with_other_rules():
+    """
+    Test that a precomputed fingerprint is only compared with its own ignore rules.
+    """
+    expected = fingerprint(POSTS, ["id"])
+
+    assert diff(POSTS, expected) == []
+    with pytest.raises(ValueError):
+        diff(POSTS, expected, ["id", "user_id"])
+
+    expected = fingerprint(POSTS, ("user_id", "id"))
+    assert diff(POSTS, expected, ["id", "user_id", "id"]) == []
+
+def test_check_contract_aggregates_result():
+    """
+    Test that a contract check adds a single, bounded result to Check.
+    """
+    check = Check()
+    expected = fingerprint(POSTS, VOLATILE_FIELDS)
+
+    check_contract([dict(post, id=0) for post in POSTS], expected, check, "Posts should match.")
+    assert not check.consume_errors()
+
+    check_contract([dict(post, body="") for post in POSTS], expected, check, "Posts should match.")
+    errors = check.consume_errors()
+    assert len(errors) == 1
+    assert "(1000 differences)" in errors[0]
+    assert f"... and {1000 - contract.MAX_REPORTED_DIFFS} more" in errors[0]
+    assert "Post 999" not in errors[0]
+    assert errors[0].count("[0].body") == 1
+
+def test_check_snapshot_records_and_compares(snapshot_dir):
+    """
+    Test that a missing snapshot is recorded and later responses are compared to it.
+    """
+    check = Check()
+
+    check_snapshot("user_posts", POSTS, check)
+    assert (snapshot_dir / "user_posts.json").exists()
+    assert load_snapshot("user_posts") == POSTS
+    assert not check.consume_errors()
+
+    check_snapshot("user_posts", [dict(post, id=0) for post in POSTS], check)
+    assert not check.consume_errors()
+
+    check_snapshot("user_posts", POSTS[:-1], check)
+    errors = check.consume_errors()
+    assert len(errors) == 1
+    assert "Response should match snapshot 'user_posts'" in errors[0]
+
+def test_check_snapshot_skips_loading_unchanged_snapshot(snapshot_dir, monkeypatch):
+    """
+    Test that an unchanged response is confirmed by the stored digest alone.
+    """
+    check = Check()
+    check_snapshot("user_posts", POSTS, check)
+    assert (snapshot_dir / "user_posts.digest.json").exists()
+
+    def fail_load(name):
+        raise AssertionError(f"Snapshot {name} should not be loaded")
+
+    monkeypatch.setattr(contract, "load_snapshot", fail_load)
+    check_snapshot("user_posts", [dict(post, id=0) for post in POSTS], check)
+    assert not check.consume_errors()
+
+def test_check_snapshot_fails_when_missing_on_ci(snapshot_dir, monkeypatch):
+    """
+    Test that a missing snapshot fails instead of being recorded on CI.
+    """
+    monkeypatch.setenv(contract.CI_ENV, "true")
+    check = Check()
+
+    check_snapshot("user_posts", POSTS, check)
+    assert len(check.consume_errors()) == 1
+    assert load_snapshot("user_posts") is None
@@ -6,6 +6,7 @@ import logging
 from utils.fixtures import (create_user, create_user_post, create_post_comment,
                             get_post_comments, cleanup_user)
 from utils.check import Check
+from utils.contract import check_contract
 
 # Define the path to the JSON repository
 json_repo_dir = Path(__file__).resolve().parent.parent / "json_repo"
@@ -107,23 +108,27 @@ def test_get_comments(user_with_post, check):
     """
     user_id, post_id = user_with_post
 
-    # Create a comment for the post first
-    comment_data = {
-        "name": "Test User Comments",
-        "email": f"{uuid.uuid4()}@example.com",
-        "body": "Sample comment body."
-    }
-    create_post_comment(post_id, comment_data, check)
+    # Create comments for the post first
+    comments_data = [
+        {
+            "name": f"Test User Comments {index}",
+            "email": f"{uuid.uuid4()}@example.com",
+            "body": "Sample comment body."
+        }
+        for index in range(3)
+    ]
+    for comment_data in comments_data:
+        create_post_comment(post_id, comment_data, check)
 
     # Retrieve the comments for the post
     post_comments = get_post_comments(post_id, check)
-    check(len(post_comments) > 0, "Post should have at least one comment.")
 
-    # Check the retrieved comment
-    check(post_comments[0].get("name") == comment_data["name"],
-          f"Retrieved comment name should match the created comment name. Expected: '{comment_data['name']}', Actual: '{post_comments[0].get('name')}'")
-    check(post_comments[0].get("body") == comment_data["body"],
-          f"Retrieved comment body should match the created comment body. Expected: '{comment_data['body']}', Actual: '{post_comments[0].get('body')}'")
+    # Check the whole list against the created comments, oldest first
+    retrieved_comments = post_comments
+    if isinstance(post_comments, list):
+        retrieved_comments = sorted(post_comments, key=lambda comment: comment.get("id", 0))
+    check_contract(retrieved_comments, comments_data, check,
+                   "Retrieved comments should match the created comments.")
 
     logger.info(f"Post comments retrieved for post ID: {post_id}")
 
@@ -4,6 +4,7 @@ import pytest
 import logging
 from utils.fixtures import create_user, create_user_post, get_user_posts, cleanup_user
 from utils.check import Check
+from utils.contract import check_contract
 
 # Define the path to the JSON repository
 json_repo_dir = Path(__file__).resolve().parent.parent / "json_repo"
@@ -64,23 +65,26 @@ def test_get_post(user, check):
     """
     Test retrieving posts for a user.
     """
-    # Create a post for the user first
-    post_data = {
-        "title": "Sample Post Title",
-        "body": "This is a sample post body."
-    }
-    post_id, _ = create_user_post(user, post_data, check)
+    # Create posts for the user first
+    posts_data = [
+        {
+            "title": f"Sample Post Title {index}",
+            "body": "This is a sample post body."
+        }
+        for index in range(3)
+    ]
+    for post_data in posts_data:
+        create_user_post(user, post_data, check)
 
     # Retrieve the posts for the user
     user_posts = get_user_posts(user, check)
-    check(len(user_posts) > 0, "User should have at least one post.")
 
-    # Check the retrieved post details
-    retrieved_post = user_posts[0]
-    check(retrieved_post.get("title") == post_data["title"],
-          f"Retrieved post title should match the created post title. Expected: {post_data['title']}, Actual: {retrieved_post.get('title')}")
-    check(retrieved_post.get("body") == post_data["body"],
-          f"Retrieved post body should match the created post body. Expected: {post_data['body']}, Actual: {retrieved_post.get('body')}")
+    # Check the whole list against the created posts, oldest first
+    retrieved_posts = user_posts
+    if isinstance(user_posts, list):
+        retrieved_posts = sorted(user_posts, key=lambda post: post.get("id", 0))
+    check_contract(retrieved_posts, posts_data, check,
+                   "Retrieved posts should match the created posts.")
 
     logger.info(f"User posts retrieved successfully for user ID: {user}")
 
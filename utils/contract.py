@@ -0,0 +1,565 @@
+"""Contract util.
+
+Compares whole API responses (or lists of responses) against stored
+expectations instead of checking them field by field. Every sub-tree of a
+response is reduced to a structural fingerprint. Hashing a response is a
+single O(n) pass; after that, only sub-trees whose fingerprints differ are
+walked to build the diff. Snapshots store the digest of the expected
+response, so an unchanged response is confirmed by one digest comparison
+without loading or re-hashing the snapshot.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+from pathlib import Path
+from typing import (
+    Any,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    Optional,
+    Pattern,
+    Tuple,
+)
+
+from utils.check import Check
+
+log = logging.getLogger(__name__)
+
+SNAPSHOT_DIR = (
+    Path(__file__).resolve().parent.parent / "json_repo" / "snapshots"
+)
+UPDATE_SNAPSHOTS_ENV = "UPDATE_SNAPSHOTS"
+CI_ENV = "CI"
+
+# Fields that the GoREST API generates per run and can never match a stored
+# expectation.
+VOLATILE_FIELDS = ("id", "user_id", "post_id", "email")
+
+# Maximum number of differences listed in a failed check message.
+MAX_REPORTED_DIFFS = 20
+
+# Most insertions, removals and changes looked for when aligning lists of
+# different lengths; beyond that, items are paired by position.
+MAX_EDIT_DISTANCE = 100
+
+_Rules = Tuple[FrozenSet[str], Tuple[Pattern, ...]]
+_PATH_CHARS = frozenset(".[*")
+_Items = List[Tuple[int, "Fingerprint"]]
+
+
+class Fingerprint:
+    """Hashed structure of a JSON value together with its children."""
+
+    __slots__ = ("digest", "value", "children", "ignore")
+
+    def __init__(
+        self,
+        digest: str,
+        value: Any,
+        children: Dict[Any, "Fingerprint"],
+        ignore: Tuple[str, ...] = (),
+    ):
+        self.digest = digest
+        self.value = value
+        self.children = children
+        self.ignore = ignore
+
+
+def _normalize_rules(ignore: Iterable[str]) -> Tuple[str, ...]:
+    return tuple(sorted(set(ignore)))
+
+
+def _compile_rules(ignore: Tuple[str, ...]) -> _Rules:
+    """Split ignore rules into bare key names and compiled path patterns.
+
+    In path patterns only ``*`` is a wildcard; brackets are literal.
+    """
+    names = frozenset(rule for rule in ignore if not _PATH_CHARS & set(rule))
+    patterns = tuple(
+        re.compile(re.escape(rule).replace(r"\*", ".*"))
+        for rule in ignore
+        if rule not in names
+    )
+    return names, patterns
+
+
+def _is_ignored(path: str, key: Any, rules: _Rules) -> bool:
+    """Return True if the value at ``path`` matches one of the ignore rules.
+
+    A rule matches either the bare key name (at any depth) or the full path
+    as a pattern where ``*`` matches anything, e.g. ``"email"``, ``"[*].id"``,
+    ``"user.*"`` or ``"tags[0]"``.
+    """
+    names, patterns = rules
+    return key in names or any(pattern.fullmatch(path) for pattern in patterns)
+
+
+def _child_path(path: str, key: Any) -> str:
+    if isinstance(key, int):
+        return f"{path}[{key}]"
+    return f"{path}.{key}" if path else str(key)
+
+
+def _fingerprint(value: Any, rules: _Rules, path: str) -> Fingerprint:
+    children: Dict[Any, Fingerprint] = {}
+    hasher = hashlib.sha1()
+
+    if isinstance(value, dict):
+        hasher.update(b"{")
+        for key in sorted(value, key=str):
+            child_path = _child_path(path, key)
+            if _is_ignored(child_path, key, rules):
+                continue
+            child = _fingerprint(value[key], rules, child_path)
+            children[key] = child
+            hasher.update(json.dumps(str(key)).encode())
+            hasher.update(child.digest.encode())
+        hasher.update(b"}")
+    elif isinstance(value, list):
+        hasher.update(b"[")
+        for index, item in enumerate(value):
+            child_path = _child_path(path, index)
+            if _is_ignored(child_path, index, rules):
+                continue
+            child = _fingerprint(item, rules, child_path)
+            children[index] = child
+            hasher.update(child.digest.encode())
+        hasher.update(b"]")
+    else:
+        hasher.update(json.dumps(value, sort_keys=True).encode())
+
+    return Fingerprint(hasher.hexdigest(), value, children)
+
+
+def fingerprint(value: Any, ignore: Iterable[str] = ()) -> Fingerprint:
+    """Build the fingerprint tree of a JSON value.
+
+    Args:
+        value: Decoded JSON value (dict, list or scalar).
+        ignore: Key names or path patterns that are left out of the
+            fingerprint, e.g. generated ids and emails.
+
+    Returns:
+        Fingerprint of ``value``; ``children`` holds the fingerprints of the
+        dict values or list items that are not ignored.
+    """
+    ignore = _normalize_rules(ignore)
+    root = _fingerprint(value, _compile_rules(ignore), "")
+    root.ignore = ignore
+    return root
+
+
+def _diff_items(actual: _Items, expected: _Items, path: str, diffs: List[str]):
+    """Diff list items pairwise; leftover items are missing or unexpected."""
+    paired = min(len(actual), len(expected))
+    for (act_index, act_child), (_, exp_child) in zip(actual, expected):
+        _diff(act_child, exp_child, _child_path(path, act_index), diffs)
+    for exp_index, exp_child in expected[paired:]:
+        diffs.append(
+            f"{path}[expected {exp_index}]: missing, "
+            f"expected {exp_child.value!r}"
+        )
+    for act_index, act_child in actual[paired:]:
+        diffs.append(
+            f"{_child_path(path, act_index)}: unexpected, "
+            f"actual {act_child.value!r}"
+        )
+
+
+def _change_cost(expected: Fingerprint, actual: Fingerprint) -> int:
+    """Return 0 for equal items, 1 for items sharing a field, 2 otherwise.
+
+    A change costs as much as a removal plus an addition unless the items
+    have something in common, so unrelated items are not paired up.
+    """
+    if expected.digest == actual.digest:
+        return 0
+    for key, child in expected.children.items():
+        other = actual.children.get(key)
+        if other is not None and other.digest == child.digest:
+            return 1
+    return 2
+
+
+def _aligned(
+    expected: List[Fingerprint], actual: List[Fingerprint], band: int
+) -> Optional[List[str]]:
+    """Align two item lists at an edit cost of at most ``band``, or None.
+
+    Edit distance restricted to diagonals within ``band`` of each other
+    (Ukkonen), so it takes O(N * band) instead of O(N * M).
+    """
+    exp_len, act_len = len(expected), len(actual)
+    width = 2 * band + 1
+    unreachable = band + 1
+    costs = [[unreachable] * width for _ in range(exp_len + 1)]
+    for act_pos in range(min(act_len, band) + 1):
+        costs[0][act_pos + band] = act_pos
+    for exp_pos in range(1, exp_len + 1):
+        row, prev = costs[exp_pos], costs[exp_pos - 1]
+        low = max(0, exp_pos - band)
+        high = min(act_len, exp_pos + band)
+        for act_pos in range(low, high + 1):
+            offset = act_pos - exp_pos + band
+            cost = prev[offset + 1] + 1 if offset + 1 < width else unreachable
+            if act_pos > low:
+                cost = min(cost, row[offset - 1] + 1)
+            elif act_pos == 0:
+                cost = min(cost, exp_pos)
+            if act_pos > 0:
+                change = _change_cost(
+                    expected[exp_pos - 1], actual[act_pos - 1]
+                )
+                cost = min(cost, prev[offset] + change)
+            row[offset] = cost
+    if act_len - exp_len + band not in range(width):
+        return None
+    if costs[exp_len][act_len - exp_len + band] > band:
+        return None
+
+    steps = []
+    exp_pos, act_pos = exp_len, act_len
+    while exp_pos or act_pos:
+        offset = act_pos - exp_pos + band
+        cost = costs[exp_pos][offset]
+        if exp_pos and act_pos:
+            change = _change_cost(expected[exp_pos - 1], actual[act_pos - 1])
+            if costs[exp_pos - 1][offset] + change == cost:
+                steps.append("changed" if change else "equal")
+                exp_pos -= 1
+                act_pos -= 1
+                continue
+        if (
+            exp_pos
+            and offset + 1 < width
+            and costs[exp_pos - 1][offset + 1] + 1 == cost
+        ):
+            steps.append("removed")
+            exp_pos -= 1
+        else:
+            steps.append("added")
+            act_pos -= 1
+    steps.reverse()
+    return steps
+
+
+def _edit_script(
+    expected: List[Fingerprint], actual: List[Fingerprint]
+) -> Optional[List[str]]:
+    """Return the steps that turn ``expected`` into ``actual``.
+
+    Each step is ``"equal"``, ``"changed"``, ``"removed"`` or ``"added"``.
+    The allowed edit cost is doubled until an alignment is found, so a few
+    changes in a long list stay cheap even when many items are identical.
+    None if the cost exceeds ``MAX_EDIT_DISTANCE``.
+    """
+    band = max(abs(len(expected) - len(actual)), 1)
+    if band > MAX_EDIT_DISTANCE:
+        return None
+    while band < MAX_EDIT_DISTANCE:
+        steps = _aligned(expected, actual, band)
+        if steps is not None:
+            return steps
+        band *= 2
+    return _aligned(expected, actual, MAX_EDIT_DISTANCE)
+
+
+def _diff_list(
+    actual: Fingerprint, expected: Fingerprint, path: str, diffs: List[str]
+):
+    """Diff two lists, aligning items only where their lengths differ."""
+    act_items = list(actual.children.items())
+    exp_items = list(expected.children.items())
+    if len(act_items) == len(exp_items):
+        _diff_items(act_items, exp_items, path, diffs)
+        return
+
+    diffs.append(
+        f"{path or '<root>'}: expected {len(exp_items)} items, "
+        f"actual {len(act_items)} items"
+    )
+
+    # Items before and after an insertion or removal are usually unchanged.
+    shortest = min(len(act_items), len(exp_items))
+    start = 0
+    while (
+        start < shortest
+        and act_items[start][1].digest == exp_items[start][1].digest
+    ):
+        start += 1
+    end = 0
+    while (
+        end < shortest - start
+        and act_items[-1 - end][1].digest == exp_items[-1 - end][1].digest
+    ):
+        end += 1
+    act_stop, exp_stop = len(act_items) - end, len(exp_items) - end
+    act_middle = act_items[start:act_stop]
+    exp_middle = exp_items[start:exp_stop]
+
+    script = _edit_script(
+        [child for _, child in exp_middle], [child for _, child in act_middle]
+    )
+    if script is None:
+        _diff_items(act_middle, exp_middle, path, diffs)
+        return
+
+    exp_pos = act_pos = 0
+    for step in script:
+        if step in ("changed", "removed"):
+            exp_index, exp_child = exp_middle[exp_pos]
+        if step in ("changed", "added"):
+            act_index, act_child = act_middle[act_pos]
+        if step == "changed":
+            _diff(act_child, exp_child, _child_path(path, act_index), diffs)
+        elif step == "removed":
+            diffs.append(
+                f"{path}[expected {exp_index}]: missing, "
+                f"expected {exp_child.value!r}"
+            )
+        elif step == "added":
+            diffs.append(
+                f"{_child_path(path, act_index)}: unexpected, "
+                f"actual {act_child.value!r}"
+            )
+        exp_pos += step != "added"
+        act_pos += step != "removed"
+
+
+def _diff(
+    actual: Fingerprint, expected: Fingerprint, path: str, diffs: List[str]
+):
+    """Collect differences, descending only into sub-trees that changed."""
+    if actual.digest == expected.digest:
+        return
+
+    same_type = type(actual.value) is type(expected.value)
+    if not same_type or not isinstance(actual.value, (dict, list)):
+        diffs.append(
+            f"{path or '<root>'}: expected {expected.value!r}, "
+            f"actual {actual.value!r}"
+        )
+        return
+
+    if isinstance(expected.value, list):
+        _diff_list(actual, expected, path, diffs)
+        return
+
+    for key, expected_child in expected.children.items():
+        child_path = _child_path(path, key)
+        if key not in actual.children:
+            diffs.append(
+                f"{child_path}: missing, expected {expected_child.value!r}"
+            )
+        else:
+            _diff(actual.children[key], expected_child, child_path, diffs)
+
+    for key in actual.children.keys() - expected.children.keys():
+        diffs.append(
+            f"{_child_path(path, key)}: unexpected, "
+            f"actual {actual.children[key].value!r}"
+        )
+
+
+def _resolve_ignore(
+    expected: Any, ignore: Optional[Iterable[str]], default: Tuple[str, ...]
+) -> Tuple[str, ...]:
+    """Return the ignore rules to use.
+
+    A precomputed ``expected`` fingerprint is only compared with the rules it
+    was built with.
+    """
+    if not isinstance(expected, Fingerprint):
+        return _normalize_rules(default if ignore is None else ignore)
+    if ignore is not None and _normalize_rules(ignore) != expected.ignore:
+        raise ValueError(
+            f"Ignore rules {tuple(ignore)} differ from the rules the expected "
+            f"fingerprint was built with: {expected.ignore}"
+        )
+    return expected.ignore
+
+
+def diff(
+    actual: Any, expected: Any, ignore: Optional[Iterable[str]] = None
+) -> List[str]:
+    """Return the differences between ``actual`` and ``expected``.
+
+    List indexes in the reported paths refer to ``actual``; items missing
+    from ``actual`` are reported as ``[expected <index>]``.
+
+    Args:
+        actual: Response data returned by the API.
+        expected: Expected response data, or its precomputed ``Fingerprint``.
+        ignore: Key names or path patterns to leave out of the comparison.
+            A precomputed ``expected`` fingerprint brings its own rules;
+            passing different ones raises ``ValueError``.
+
+    Returns:
+        One message per differing path; an empty list means the values match.
+    """
+    ignore = _resolve_ignore(expected, ignore, ())
+    if not isinstance(expected, Fingerprint):
+        expected = fingerprint(expected, ignore)
+    diffs: List[str] = []
+    _diff(fingerprint(actual, ignore), expected, "", diffs)
+    return diffs
+
+
+class _ContractResult:
+    """Outcome of a contract check with a short repr.
+
+    ``Check`` logs the caller's locals on failure; this keeps the responses
+    and the full difference list out of that log.
+    """
+
+    __slots__ = ("success", "message", "count")
+
+    def __init__(self, message: str, diffs: List[str]):
+        self.success = not diffs
+        self.count = len(diffs)
+        if diffs:
+            reported = diffs[:MAX_REPORTED_DIFFS]
+            if len(diffs) > MAX_REPORTED_DIFFS:
+                hidden = len(diffs) - MAX_REPORTED_DIFFS
+                reported.append(f"... and {hidden} more")
+            message = f"{message} ({len(diffs)} differences)\n\t"
+            message += "\n\t".join(reported)
+        self.message = message
+
+    def __repr__(self):
+        return f"<contract result: {self.count} differences>"
+
+
+def _check_fingerprints(
+    actual: Fingerprint, expected: Fingerprint, check: Check, message: str
+):
+    diffs: List[str] = []
+    _diff(actual, expected, "", diffs)
+    result = _ContractResult(message, diffs)
+    del actual, expected, diffs
+    check(result.success, result.message)
+
+
+def check_contract(
+    actual: Any,
+    expected: Any,
+    check: Check,
+    message: str,
+    ignore: Optional[Iterable[str]] = None,
+):
+    """Compare a whole response against its expectation as a single check.
+
+    Args:
+        actual: Response data returned by the API.
+        expected: Expected response data, or its precomputed ``Fingerprint``.
+        check: Check instance the aggregated result is added to.
+        message: Message that describes the check.
+        ignore: Key names or path patterns to leave out of the comparison.
+            Defaults to the fields GoREST generates per run, or to the rules
+            of a precomputed ``expected`` fingerprint.
+    """
+    ignore = _resolve_ignore(expected, ignore, VOLATILE_FIELDS)
+    if not isinstance(expected, Fingerprint):
+        expected = fingerprint(expected, ignore)
+    _check_fingerprints(fingerprint(actual, ignore), expected, check, message)
+
+
+def _snapshot_file(name: str) -> Path:
+    return SNAPSHOT_DIR / f"{name}.json"
+
+
+def _digest_file(name: str) -> Path:
+    return SNAPSHOT_DIR / f"{name}.digest.json"
+
+
+def load_snapshot(name: str) -> Optional[Any]:
+    """Load the stored expectation ``name``, or None if it does not exist."""
+    snapshot_file = _snapshot_file(name)
+    if not snapshot_file.exists():
+        return None
+    with snapshot_file.open() as f:
+        return json.load(f)
+
+
+def _load_digest(name: str) -> Optional[Dict[str, Any]]:
+    digest_file = _digest_file(name)
+    if not digest_file.exists() or not _snapshot_file(name).exists():
+        return None
+    with digest_file.open() as f:
+        return json.load(f)
+
+
+def save_snapshot(
+    name: str, data: Any, ignore: Iterable[str] = VOLATILE_FIELDS
+):
+    """Store ``data`` as the expectation ``name``.
+
+    The digest of ``data`` under ``ignore`` is stored next to it, so
+    unchanged responses can be confirmed without loading the snapshot.
+    """
+    root = fingerprint(data, ignore)
+    SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+    with _snapshot_file(name).open("w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write("\n")
+    with _digest_file(name).open("w") as f:
+        json.dump({"digest": root.digest, "ignore": list(root.ignore)}, f)
+        f.write("\n")
+    log.info(f"Snapshot saved: {name}")
+
+
+def check_snapshot(
+    name: str,
+    actual: Any,
+    check: Check,
+    ignore: Iterable[str] = VOLATILE_FIELDS,
+):
+    """Compare a response against the stored snapshot ``name``.
+
+    If the snapshot does not exist yet, or the ``UPDATE_SNAPSHOTS``
+    environment variable is set, ``actual`` is stored as the new snapshot
+    instead of being compared. On CI (``CI`` environment variable set) a
+    missing snapshot fails the check instead of being recorded.
+
+    Args:
+        name: Snapshot name; stored as ``json_repo/snapshots/<name>.json``.
+        actual: Response data returned by the API.
+        check: Check instance the aggregated result is added to.
+        ignore: Key names or path patterns to leave out of the comparison.
+    """
+    message = f"Response should match snapshot '{name}'"
+    if os.getenv(UPDATE_SNAPSHOTS_ENV):
+        save_snapshot(name, actual, ignore)
+        check(True, f"Snapshot '{name}' updated")
+        return
+
+    actual_root = fingerprint(actual, ignore)
+    stored = _load_digest(name)
+    if (
+        stored is not None
+        and tuple(stored["ignore"]) == actual_root.ignore
+        and stored["digest"] == actual_root.digest
+    ):
+        check(True, message)
+        return
+
+    expected = load_snapshot(name)
+    if expected is None:
+        if os.getenv(CI_ENV):
+            del actual, actual_root
+            check(
+                False,
+                f"Snapshot '{name}' does not exist; record it locally first",
+            )
+            return
+        save_snapshot(name, actual, ignore)
+        check(True, f"Snapshot '{name}' recorded")
+        return
+
+    expected_root = fingerprint(expected, actual_root.ignore)
+    _check_fingerprints(actual_root, expected_root, check, message)